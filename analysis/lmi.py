@@ -24,7 +24,8 @@ datefmt = "%Y-%m-%d %H:%M"
 import matplotlib.pyplot as plt
 import geopandas as gpd
 from Utilities import track
-from shapely.geometry import LineString, Point
+import shapely
+from shapely.geometry import Point
 import shapely.geometry as sg
 from shapely.geometry import box as sbox
 import numpy as np
@@ -64,10 +65,16 @@ def filter_tracks_domain(df, minlon=90, maxlon=180, minlat=-40, maxlat=0):
     :param float maxlat: maximum latitude of the bounding box
     """
     domain = sbox(minlon, minlat, maxlon, maxlat, ccw=False)
-    tracks = df.groupby('num')
-    tempfilter = tracks.filter(lambda x: len(x) > 1)
-    tempfilter.head()
-    filterdf = tempfilter.groupby('num').filter(lambda x: LineString(zip(x['lon'], x['lat'])).intersects(domain))
+    tempfilter = df[df.groupby('num')['num'].transform('size') > 1]
+    # Build one LineString per track directly from the coordinate arrays,
+    # rather than via a Python list of points for each group:
+    codes, _ = pd.factorize(tempfilter['num'])
+    order = np.argsort(codes, kind='stable')
+    lines = shapely.linestrings(tempfilter['lon'].values[order],
+                                tempfilter['lat'].values[order],
+                                indices=codes[order])
+    keep = shapely.intersects(lines, domain)
+    filterdf = tempfilter[keep[codes]]
     return filterdf
 
 def isLeft(line, point):
@@ -98,24 +105,25 @@ def isLandfall(gate, tracks):
 
 def readTracks(trackFile):
     tracks = track.ncReadTrackData(trackFile)
-    trackgdf = []
-    for t in tracks:
-        segments = []
-        for n in range(len(t.data) - 1):
-            segment = LineString([[t.Longitude[n], t.Latitude[n]],
-                                  [t.Longitude[n+1], t.Latitude[n+1]]])
-            
-            segments.append(segment)
-        gdf = gpd.GeoDataFrame.from_records(t.data[:-1])
-        gdf['geometry'] = segments
-        gdf['category'] = pd.cut(gdf['CentralPressure'], 
-                                bins=[0, 930, 955, 970, 985, 990, 1020], 
-                                labels=[5,4,3,2,1,0])
-        # Calculate pressure difference and normalised intensity
-        gdf['pdiff'] = gdf.EnvPressure - gdf.CentralPressure
-        gdf['ni'] = gdf.pdiff / gdf.pdiff.max()
-        trackgdf.append(gdf)
-    trackgdf = pd.concat(trackgdf)
+    data = np.concatenate([t.data for t in tracks])
+    trackid = np.repeat(np.arange(len(tracks)), [len(t.data) for t in tracks])
+
+    # Every record starts a segment, except the last record of each track.
+    # Build all segments in one call, from an array of (start, end)
+    # coordinate pairs with shape (nsegments, 2, 2)
+    start = np.flatnonzero(trackid[:-1] == trackid[1:])
+    end = start + 1
+    coords = np.stack([np.column_stack([data['Longitude'][start], data['Latitude'][start]]),
+                       np.column_stack([data['Longitude'][end], data['Latitude'][end]])],
+                      axis=1)
+    trackgdf = gpd.GeoDataFrame.from_records(data[start])
+    trackgdf['geometry'] = shapely.linestrings(coords)
+    trackgdf['category'] = pd.cut(trackgdf['CentralPressure'], 
+                                  bins=[0, 930, 955, 970, 985, 990, 1020], 
+                                  labels=[5,4,3,2,1,0])
+    # Calculate pressure difference and normalised intensity
+    trackgdf['pdiff'] = trackgdf.EnvPressure - trackgdf.CentralPressure
+    trackgdf['ni'] = trackgdf.pdiff / trackgdf.pdiff.groupby(trackid[start]).transform('max')
     return trackgdf
 
 def calculateMaxWind(df, dtname='ISO_TIME'):
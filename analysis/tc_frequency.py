@@ -14,7 +14,10 @@ possible to programmatically remove those issues, then we may look to fully
 automate this script to read directly from the URL.
 
 """
-from os.path import join as pjoin
+import os
+import logging
+import hashlib
+from os.path import join as pjoin, isfile, getmtime, splitext
 from datetime import datetime
 
 import pandas as pd
@@ -29,22 +32,90 @@ from sklearn.linear_model import LinearRegression
 mpl.rcParams['grid.linestyle'] = ':'
 mpl.rcParams['grid.linewidth'] = 0.5
 mpl.rcParams['savefig.dpi'] = 600
+mpl.rcParams['agg.path.chunksize'] = 10000
+# Disturbance identifiers are of the form "AU201617_<ID>". Capture the first
+# year of the season and the ID
+DISTURBANCE_ID_PATTERN = r'^AU(\d{4})\d*_([^_]*)'
 locator = mdates.AutoDateLocator(minticks=10, maxticks=20)
 formatter = mdates.ConciseDateFormatter(locator)
+logger = logging.getLogger()
 
-def season(year, month):
+def load_cached_csv(csvfile, **kwargs):
     """
-    Determine the southern hemisphere TC season based on the year and month value.
-    If the month is earlier than June, we assign the season to be the preceding year.
+    Read a CSV file, using a Parquet copy of the parsed data if one exists and
+    is newer than the CSV file. The cache file name includes a hash of the
+    arguments passed to `pandas.read_csv`, so different column selections from
+    the same file do not collide. This is a copy of the helper in
+    extract/parquetcache.py, so this script runs on its own.
 
-    :params int year: Year
-    :params int month: Month
+    The copy is written to a temporary file and moved into place, so an
+    interrupted write never leaves a truncated cache. An unreadable cache is
+    rebuilt from the CSV file, and one that can't be written is skipped.
 
+    :param str csvfile: Path to the CSV file
+    :param kwargs: Additional keyword arguments passed to `pandas.read_csv`
+
+    :returns: `pandas.DataFrame` of the data
+    """
+    key = hashlib.md5(repr(sorted(kwargs.items())).encode()).hexdigest()[:8]
+    cachefile = f"{splitext(csvfile)[0]}.{key}.parquet"
+    if isfile(cachefile) and getmtime(cachefile) >= getmtime(csvfile):
+        try:
+            return pd.read_parquet(cachefile)
+        except (OSError, ValueError) as err:
+            logger.warning(f"Unable to read {cachefile} ({err}), "
+                           f"reloading {csvfile}")
+    df = pd.read_csv(csvfile, **kwargs)
+    tmpfile = f"{cachefile}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmpfile, compression='zstd')
+        os.replace(tmpfile, cachefile)
+    except OSError as err:
+        logger.warning(f"Unable to write {cachefile}: {err}")
+        if isfile(tmpfile):
+            os.remove(tmpfile)
+    return df
+
+def plot_frequency(sc, ns, idx, nsidx, source, outputFile, idx2=None,
+                   xlim=None, dpi=150):
+    """
+    Plot a bar chart of the annual number of all TCs and severe TCs, with
+    optional regression lines.
+
+    :param sc: `pandas.DataFrame` that contains the annual number of TCs
+    :param ns: `pandas.Series` that contains the annual number of severe TCs
+    :param idx: Boolean index of the seasons in `sc` to plot
+    :param nsidx: Boolean index of the seasons in `ns` to plot
+    :param str source: Source of the data, added as a footnote
+    :param str outputFile: Path to the output image
+    :param idx2: Boolean index of the seasons in `sc` for a second regression
+                 line. If given, regression lines are added for both `idx`
+                 and `idx2`.
+    :param xlim: Optional limits of the x-axis
+    :param int dpi: Resolution of the output image
+
+    :returns: The limits of the x-axis
     """
-    season = year
-    if month < 6:
-        season = year - 1
-    return int(season)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    fig.patch.set_facecolor('white')
+    ax.bar(sc.index[idx], sc.ID[idx], label="All TCs")
+    ax.bar(ns.index[nsidx], ns.values[nsidx], color='orange', label="Severe TCs")
+    if idx2 is not None:
+        sns.regplot(x=sc.index[idx], y=sc.ID[idx], ax=ax, color='0.5', scatter=False, label='1970-2020 trend')
+        sns.regplot(x=sc.index[idx2], y=sc.ID[idx2], ax=ax, color='r', scatter=False, label='1985-2020 trend')
+    ax.grid(True)
+    ax.set_yticks(np.arange(0, 21, 2))
+    if xlim is not None:
+        ax.set_xlim(xlim)
+    ax.set_xlabel("Season")
+    ax.set_ylabel("Count")
+    ax.legend(fontsize='small')
+    plt.text(0.0, -0.1, f"Source: {source}",
+             transform=ax.transAxes, fontsize='xx-small', ha='left',)
+    plt.text(1.0, -0.1, f"Created: {datetime.now():%Y-%m-%d %H:%M}",
+             transform=ax.transAxes, fontsize='xx-small', ha='right')
+    plt.savefig(outputFile, bbox_inches='tight', dpi=dpi)
+    return ax.get_xlim()
 
 def regression_trend(numbers, start_year, end_year):
     """
@@ -82,76 +153,52 @@ usecols = [0, 1, 2, 7, 8, 16, 49, 53]
 colnames = ['NAME', 'DISTURBANCE_ID', 'TM', 'LAT', 'LON',
             'CENTRAL_PRES', 'MAX_WIND_SPD', 'MAX_WIND_GUST']
 dtypes = [str, str, str, float, float, float, float, float]
-df = pd.read_csv(dataFile, skiprows=4, usecols=usecols,
-                 dtype=dict(zip(colnames, dtypes)), na_values=[' '])
+df = load_cached_csv(dataFile, skiprows=4, usecols=usecols,
+                     dtype=dict(zip(colnames, dtypes)), na_values=[' '])
 
 
 
 df['TM'] = pd.to_datetime(df.TM, format="%Y-%m-%d %H:%M", errors='coerce')
-df['year'] = pd.DatetimeIndex(df['TM']).year
-df['month'] = pd.DatetimeIndex(df['TM']).month
-df['season'] = df[['year', 'month']].apply(lambda x: season(*x), axis=1)
+# Southern hemisphere TC season: if the month is earlier than June, we assign
+# the season to be the preceding year.
+dt = pd.DatetimeIndex(df['TM'])
+df['year'] = dt.year.astype('int16')
+df['month'] = dt.month.astype('int8')
+df['season'] = (dt.year - (dt.month < 6)).astype('int16')
 
 # Determine season based on the coded disturbance identifier:
 # This is of the form "AU201617_<ID>". The first four digits represent the first
 # year of the season, the last two the second year of the season
 # (which runs November - April)
 
-new = df['DISTURBANCE_ID'].str.split("_", expand=True)
-df['ID'] = new[1]
-df['IDSEAS'] = new[0].str[:6].str.strip('AU').astype(int)
+parts = df['DISTURBANCE_ID'].str.extract(DISTURBANCE_ID_PATTERN)
+df['IDSEAS'] = parts[0].astype(np.int16)
+df['ID'] = parts[1]
 
 # Calculate the number of unique values in each season:
-sc = df.groupby(['IDSEAS']).nunique()
+sc = df.groupby('IDSEAS')['ID'].nunique().astype(np.int16).to_frame()
 
 # Determine the number of severe TCs. 
 # take the number of TCs with maximum wind speed > 32 m/s
-xc = df.groupby([ 'DISTURBANCE_ID',]).agg({
-    'CENTRAL_PRES': np.min,
-    'MAX_WIND_GUST': np.max,
-    'MAX_WIND_SPD': np.max,
-    'ID':np.max, 'IDSEAS': 'max'})
-ns = xc[xc['MAX_WIND_SPD'] > 32].groupby('IDSEAS').nunique()['ID']
+xc = df.groupby('DISTURBANCE_ID', sort=False).agg(
+    CENTRAL_PRES=('CENTRAL_PRES', 'min'),
+    MAX_WIND_GUST=('MAX_WIND_GUST', 'max'),
+    MAX_WIND_SPD=('MAX_WIND_SPD', 'max'),
+    ID=('ID', 'max'), IDSEAS=('IDSEAS', 'max'))
+ns = xc[xc['MAX_WIND_SPD'] > 32].groupby('IDSEAS')['ID'].nunique().astype(np.int16)
 
 
 idx = sc.index >= 1970
 idx2 = sc.index >= 1985
 nsidx = ns.index >= 1970
-fig, ax = plt.subplots(figsize=(10, 6))
-fig.patch.set_facecolor('white')
-ax.bar(sc.index[idx], sc.ID[idx], label="All TCs")
-ax.bar(ns.index[nsidx], ns.values[nsidx], color='orange', label="Severe TCs")
-ax.grid(True)
-ax.set_yticks(np.arange(0, 21, 2))
-ax.set_xlabel("Season")
-ax.set_ylabel("Count")
-ax.legend(fontsize='small')
-plt.text(0.0, -0.1, "Source: http://www.bom.gov.au/clim_data/IDCKMSTM0S.csv",
-         transform=ax.transAxes, fontsize='xx-small', ha='left',)
-plt.text(1.0, -0.1, f"Created: {datetime.now():%Y-%m-%d %H:%M}",
-         transform=ax.transAxes, fontsize='xx-small', ha='right')
-plt.savefig(pjoin(outputPath, "TC_frequency.png"), bbox_inches='tight')
+source = "http://www.bom.gov.au/clim_data/IDCKMSTM0S.csv"
+plot_frequency(sc, ns, idx, nsidx, source,
+               pjoin(outputPath, "TC_frequency.png"))
 
 # Add regression lines - one for all years >= 1970, another for all years >= 1985
-fig, ax = plt.subplots(figsize=(10, 6))
-fig.patch.set_facecolor('white')
-ax.bar(sc.index[idx], sc.ID[idx], label="All TCs")
-ax.bar(ns.index[nsidx], ns.values[nsidx], color='orange', label="Severe TCs")
-sns.regplot(x=sc.index[idx], y=sc.ID[idx], ax=ax, color='0.5', scatter=False, label='1970-2020 trend')
-sns.regplot(x=sc.index[idx2], y=sc.ID[idx2], ax=ax, color='r', scatter=False, label='1985-2020 trend')
-ax.grid(True)
-
-ax.set_yticks(np.arange(0, 21, 2))
-
-ax.set_xlabel("Season")
-ax.set_ylabel("Count")
-ax.legend(fontsize='small')
-plt.text(0.0, -0.1, "Source: http://www.bom.gov.au/clim_data/IDCKMSTM0S.csv",
-         transform=ax.transAxes, fontsize='xx-small', ha='left',)
-plt.text(1.0, -0.1, f"Created: {datetime.now():%Y-%m-%d %H:%M}",
-         transform=ax.transAxes, fontsize='xx-small', ha='right')
-plt.savefig(pjoin(outputPath, "TC_frequency_reg.png"), bbox_inches='tight')
-xlim = ax.get_xlim()
+xlim = plot_frequency(sc, ns, idx, nsidx, source,
+                      pjoin(outputPath, "TC_frequency_reg.png"),
+                      idx2=idx2, dpi=600)
 
 
 ns.to_csv(pjoin(outputPath, "severe_tcs.csv"))
@@ -190,70 +237,45 @@ usecols = [0, 1, 2, 7, 8, 11, 12]
 colnames = ['NAME', 'DISTURBANCE_ID', 'TM', 'LAT', 'LON',
             'adj. ADT Vm (kn)', 'CP(CKZ(Lok R34,LokPOCI, adj. Vm),hPa)']
 dtypes = [str, str, str, float, float, float, float]
-otcrdf = pd.read_csv(dataFile, usecols=usecols,
-                     dtype=dict(zip(colnames, dtypes)), na_values=[' '], nrows=13743)
+otcrdf = load_cached_csv(dataFile, usecols=usecols,
+                         dtype=dict(zip(colnames, dtypes)), na_values=[' '],
+                         nrows=13743)
 colrenames = {'adj. ADT Vm (kn)':'MAX_WIND_SPD',
               'TM': 'datetime',
               'CP(CKZ(Lok R34,LokPOCI, adj. Vm),hPa)': 'CENTRAL_PRES'}
 otcrdf.rename(colrenames, axis=1, inplace=True)
 otcrdf['datetime'] = pd.to_datetime(otcrdf.datetime, format="%Y-%m-%d %H:%M", errors='coerce')
-otcrdf['year'] = pd.DatetimeIndex(otcrdf['datetime']).year
-otcrdf['month'] = pd.DatetimeIndex(otcrdf['datetime']).month
-otcrdf['season'] = otcrdf[['year', 'month']].apply(lambda x: season(*x), axis=1)
-
-new = otcrdf['DISTURBANCE_ID'].str.split("_", expand=True)
-otcrdf['ID'] = new[1]
-otcrdf['IDSEAS'] = new[0].str[:6].str.strip('AU').astype(int)
+dt = pd.DatetimeIndex(otcrdf['datetime'])
+otcrdf['year'] = dt.year.astype('int16')
+otcrdf['month'] = dt.month.astype('int8')
+otcrdf['season'] = (dt.year - (dt.month < 6)).astype('int16')
+
+parts = otcrdf['DISTURBANCE_ID'].str.extract(DISTURBANCE_ID_PATTERN)
+otcrdf['IDSEAS'] = parts[0].astype(np.int16)
+otcrdf['ID'] = parts[1]
 # Calculate the number of unique values in each season:
-otcrsc = otcrdf.groupby(['IDSEAS']).nunique()
+otcrsc = otcrdf.groupby('IDSEAS')['ID'].nunique().astype(np.int16).to_frame()
 
 # Determine the number of severe TCs. 
 # take the number of TCs with maximum wind speed > 63 kts
 # NOTE: The OTCR data uses knots, not metres/second!
-otcrxc = otcrdf.groupby(['DISTURBANCE_ID',]).agg({
-    'CENTRAL_PRES': np.min,
-    'MAX_WIND_SPD': np.max,
-    'ID':np.max, 'IDSEAS': 'max'})
+otcrxc = otcrdf.groupby('DISTURBANCE_ID', sort=False).agg(
+    CENTRAL_PRES=('CENTRAL_PRES', 'min'),
+    MAX_WIND_SPD=('MAX_WIND_SPD', 'max'),
+    ID=('ID', 'max'), IDSEAS=('IDSEAS', 'max'))
 
-otcrns = otcrxc[otcrxc['MAX_WIND_SPD'] > 63].groupby('IDSEAS').nunique()['ID']
+otcrns = otcrxc[otcrxc['MAX_WIND_SPD'] > 63].groupby('IDSEAS')['ID'].nunique().astype(np.int16)
 idx = otcrsc.index >= 1980
 idx2 = otcrsc.index >= 1985
 nsidx = otcrns.index >= 1980
-fig, ax = plt.subplots(figsize=(10, 6))
-fig.patch.set_facecolor('white')
-ax.bar(otcrsc.index[idx], otcrsc.ID[idx], label="All TCs")
-ax.bar(otcrns.index[nsidx], otcrns.values[nsidx], color='orange', label="Severe TCs")
-ax.grid(True)
-ax.set_yticks(np.arange(0, 21, 2))
-ax.set_xlim(xlim)
-ax.set_xlabel("Season")
-ax.set_ylabel("Count")
-ax.legend(fontsize='small')
-plt.text(0.0, -0.1, "Source: http://www.bom.gov.au/cyclone/history/database/OTCR_alldata_final_external.csv",
-         transform=ax.transAxes, fontsize='xx-small', ha='left',)
-plt.text(1.0, -0.1, f"Created: {datetime.now():%Y-%m-%d %H:%M}",
-         transform=ax.transAxes, fontsize='xx-small', ha='right')
-plt.savefig(pjoin(outputPath, "TC_frequency_otcr.png"), bbox_inches='tight')
+source = "http://www.bom.gov.au/cyclone/history/database/OTCR_alldata_final_external.csv"
+plot_frequency(otcrsc, otcrns, idx, nsidx, source,
+               pjoin(outputPath, "TC_frequency_otcr.png"), xlim=xlim)
 
 # Add regression lines - one for all years >= 1970, another for all years >= 1985
-fig, ax = plt.subplots(figsize=(10, 6))
-fig.patch.set_facecolor('white')
-ax.bar(otcrsc.index[idx], otcrsc.ID[idx], label="All TCs")
-ax.bar(otcrns.index[nsidx], otcrns.values[nsidx], color='orange', label="Severe TCs")
-sns.regplot(x=otcrsc.index[idx], y=otcrsc.ID[idx], ax=ax, color='0.5', scatter=False, label='1970-2020 trend')
-sns.regplot(x=otcrsc.index[idx2], y=otcrsc.ID[idx2], ax=ax, color='r', scatter=False, label='1985-2020 trend')
-ax.grid(True)
-
-ax.set_yticks(np.arange(0, 21, 2))
-ax.set_xlim(xlim)
-ax.set_xlabel("Season")
-ax.set_ylabel("Count")
-ax.legend(fontsize='small')
-plt.text(0.0, -0.1, "Source: http://www.bom.gov.au/cyclone/history/database/OTCR_alldata_final_external.csv",
-         transform=ax.transAxes, fontsize='xx-small', ha='left',)
-plt.text(1.0, -0.1, f"Created: {datetime.now():%Y-%m-%d %H:%M}",
-         transform=ax.transAxes, fontsize='xx-small', ha='right')
-plt.savefig(pjoin(outputPath, "TC_frequency_reg_otcr.png"), bbox_inches='tight')
+plot_frequency(otcrsc, otcrns, idx, nsidx, source,
+               pjoin(outputPath, "TC_frequency_reg_otcr.png"),
+               idx2=idx2, xlim=xlim, dpi=600)
 
 
 otcrns.to_csv(pjoin(outputPath, "severe_tcs_otcr.csv"))
@@ -28,9 +28,11 @@ Usage::
 
 import os
 import shutil
+import subprocess
 import zipfile
 import git
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 
 def rmtree_onerror(func, path, exc_info):
@@ -42,6 +44,25 @@ def rmtree_onerror(func, path, exc_info):
     func(path)
 
 
+def fast_rmtree(path):
+    """
+    Delete a directory tree with the operating system's recursive delete
+    command, which is much faster than `shutil.rmtree` for large trees on
+    Windows. Falls back to `shutil.rmtree` if anything is left behind.
+    """
+    path = os.path.normpath(path)
+    if os.name == "nt":
+        cmd = ["cmd", "/c", "rmdir", "/s", "/q", path]
+    else:
+        cmd = ["rm", "-rf", path]
+    try:
+        subprocess.run(cmd, check=False)
+    except OSError:
+        pass
+    if os.path.exists(path):
+        shutil.rmtree(path, onerror=rmtree_onerror)
+
+
 def get_latest_release_zip(repo_url, folder_path):
     # Parse the GitHub repository URL to get the repository name
     repo_name = repo_url.split("/")[-1].split(".")[0]
@@ -49,11 +70,16 @@ def get_latest_release_zip(repo_url, folder_path):
     # Create a folder if it doesn't exist
     os.makedirs(folder_path, exist_ok=True)
 
-    # Clone the repository
-    repo = git.Repo.clone_from(repo_url, f"{folder_path}/{repo_name}")
+    # List the tags on the remote, so we only need to fetch the latest one
+    refs = git.cmd.Git().ls_remote("--tags", repo_url).splitlines()
+    tags = [ref.split("\t")[1].replace("refs/tags/", "")
+            for ref in refs if not ref.endswith("^{}")]
+
+    # Only the working tree is backed up, so a shallow clone is sufficient
+    clone_options = ["--depth=1", "--single-branch"]
 
     # Check if there are any tags in the repository
-    if not repo.tags:
+    if not tags:
         print(f"No tags found in the repository '{repo_url}'.")
         print("Creating a zip based on the repository content.")
         zip_file_name = (
@@ -61,12 +87,23 @@ def get_latest_release_zip(repo_url, folder_path):
         )
     else:
         # Get the latest release
-        latest_release = repo.tags[-1]
-        zip_file_name = f'{repo_name}_release_{latest_release.name}_{datetime.now().strftime("%Y%m%d")}.zip'   # noqa E501
+        latest_release = tags[-1]
+        clone_options.append(f"--branch={latest_release}")
+        zip_file_name = f'{repo_name}_release_{latest_release}_{datetime.now().strftime("%Y%m%d")}.zip'   # noqa E501
+
+    # Clone the repository
+    repo = git.Repo.clone_from(repo_url, f"{folder_path}/{repo_name}",
+                               multi_options=clone_options)
 
     # Compress the latest release files into a zip file
-    with zipfile.ZipFile(f"{folder_path}/{zip_file_name}", "w") as zip_file:
-        for root, _, files in os.walk(f"{folder_path}/{repo_name}"):
+    with open(f"{folder_path}/{zip_file_name}", "wb", buffering=1 << 20) as raw, \
+            zipfile.ZipFile(raw, "w", compression=zipfile.ZIP_DEFLATED,
+                            compresslevel=6) as zip_file:
+        for root, dirs, files in os.walk(f"{folder_path}/{repo_name}"):
+            # Skip git metadata and build artefacts
+            dirs[:] = [d for d in dirs
+                       if d not in (".git", "__pycache__")
+                       and not d.endswith(".egg-info")]
             for file in files:
                 file_path = os.path.join(root, file)
                 zip_file.write(
@@ -76,7 +113,7 @@ def get_latest_release_zip(repo_url, folder_path):
     repo.close()
 
     # Clean up: Delete the cloned repository
-    shutil.rmtree(f"{folder_path}/{repo_name}", onerror=rmtree_onerror)
+    fast_rmtree(f"{folder_path}/{repo_name}")
 
 
 if __name__ == "__main__":
@@ -89,6 +126,11 @@ if __name__ == "__main__":
         "https://github.com/GeoscienceAustralia/hazimp",
         "https://github.com/GeoscienceAustralia/nhi-tsed",
     ]
-    for repo in repos:
-        output_folder = r"X:\georisk\HaRIA_B_Wind\software"
-        get_latest_release_zip(repo, output_folder)
+    output_folder = r"X:\georisk\HaRIA_B_Wind\software"
+
+    # Each repo is cloned to its own folder, so the (network bound) clones
+    # and zips can run concurrently
+    with ThreadPoolExecutor(max_workers=len(repos)) as executor:
+        list(executor.map(
+            lambda repo: get_latest_release_zip(repo, output_folder), repos
+        ))
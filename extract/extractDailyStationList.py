@@ -11,11 +11,11 @@ import cartopy.feature as cfeature
 
 dataPath = "X:/georisk/HaRIA_B_Wind/data/raw/from_bom/2019/Daily"
 tempPath = "C:/WorkSpace/temp"
-pattern = re.compile(".*StnDet.*\.txt")
+pattern = re.compile(r"StnDet.*\.txt")
 
 filelist = os.listdir(dataPath)
 for f in filelist:
-    if pattern.match(f):
+    if pattern.search(f):
         stnfile = f
 
 colnames = ["id", 'stnNum', 'rainfalldist', 'stnName', 'stnOpen', 'stnClose',
@@ -12,34 +12,77 @@ Please check the data and remove these carriage returns (or the blank lines)
 prior to running the script.
 
 """
+import math
 from os.path import join as pjoin
 import numpy as np
 import pandas as pd
 from datetime import datetime
 import matplotlib.pyplot as plt
-from shapely.geometry import LineString
-from shapely.geometry import box as sbox
+from numba import njit
 
 import seaborn as sns
 
-# From TCRM codebase
-from Utilities.loadData import getSpeedBearing
+from parquetcache import load_cached_csv
 
 
 DATEFMT = "%Y-%m-%d %H:%M"
+EARTH_RADIUS = 6367.0  # km, consistent with TCRM
+
+@njit(cache=True)
+def speed_bearing(varidx, lon, lat, deltaT):
+    """
+    Calculate the forward speed and bearing of each record from the great
+    circle distance and azimuth between consecutive positions. This replaces
+    `Utilities.loadData.getSpeedBearing` from the TCRM codebase with a
+    compiled loop over the records.
+
+    :param varidx: Boolean `numpy.ndarray` that is True for the first record
+                   of each TC
+    :param lon: `numpy.ndarray` of longitudes
+    :param lat: `numpy.ndarray` of latitudes
+    :param deltaT: `numpy.ndarray` of time since the previous record (hours)
+
+    :returns: speed (km/h) and bearing (degrees) of each record. Both are
+              zero for the first record of each TC. As in TCRM, the speed is
+              NaN where the time step is missing or not positive, or where
+              the speed is above 200 km/h (a position or time error, not a
+              real translation speed).
+    """
+    n = len(lon)
+    speed = np.zeros(n)
+    bearing = np.zeros(n)
+    for i in range(1, n):
+        if varidx[i]:
+            continue
+        phi1 = math.radians(lat[i-1])
+        phi2 = math.radians(lat[i])
+        dlam = math.radians(lon[i] - lon[i-1])
+        a = (math.sin((phi2 - phi1) / 2.) ** 2 +
+             math.cos(phi1) * math.cos(phi2) * math.sin(dlam / 2.) ** 2)
+        dist = 2. * EARTH_RADIUS * math.asin(math.sqrt(a))
+        # NaN time steps fail this test as well
+        if deltaT[i] > 0 and dist / deltaT[i] <= 200.:
+            speed[i] = dist / deltaT[i]
+        else:
+            speed[i] = np.nan
+        theta = math.atan2(math.sin(dlam) * math.cos(phi2),
+                           math.cos(phi1) * math.sin(phi2) -
+                           math.sin(phi1) * math.cos(phi2) * math.cos(dlam))
+        bearing[i] = math.degrees(theta) % 360.
+    return speed, bearing
 
 def filter_tracks_domain(df, minlon=90, maxlon=180, minlat=-40, maxlat=0):
     """
-    Takes a `DataFrame` and filters on the basis of whether the track interscts
-    the given domain, which is specified by the minimum and maximum longitude and 
-    latitude.
+    Takes a `DataFrame` and filters on the basis of whether any point of the
+    track lies within the given domain, which is specified by the minimum and
+    maximum longitude and latitude.
     
     NOTE: This assumes the tracks and bounding box are in the same geographic 
     coordinate system (i.e. generally a latitude-longitude coordinate system). 
     It will NOT support different projections (e.g. UTM data for the bounds and
     geographic for the tracks).
     
-    NOTE: This doesn't work if there is only one point for the track. 
+    NOTE: Tracks with only one point are excluded.
     
     :param df: :class:`pandas.DataFrame` that holds the TCLV data
     :param float minlon: minimum longitude of the bounding box
@@ -47,11 +90,10 @@ def filter_tracks_domain(df, minlon=90, maxlon=180, minlat=-40, maxlat=0):
     :param float maxlon: maximum longitude of the bounding box
     :param float maxlat: maximum latitude of the bounding box
     """
-    domain = sbox(minlon, minlat, maxlon, maxlat, ccw=False)
-    tracks = df.groupby('num')
-    tempfilter = tracks.filter(lambda x: len(x) > 1)
-    tempfilter.head()
-    filterdf = tempfilter.groupby('num').filter(lambda x: LineString(zip(x['lon'], x['lat'])).intersects(domain))
+    inside = df.lon.between(minlon, maxlon) & df.lat.between(minlat, maxlat)
+    anyinside = inside.groupby(df['num']).transform('any')
+    npoints = df.groupby('num')['num'].transform('size')
+    filterdf = df[anyinside & (npoints > 1)]
     return filterdf
 
 
@@ -67,8 +109,9 @@ colnames = ['NAME', 'DISTURBANCE_ID', 'TM', 'LAT', 'LON',
             'POCI (Lok, hPa)']
 dtypes = [str, str, str, float, float, float, float, float]
 
-df = pd.read_csv(inputFile, usecols=usecols,
-                 dtype=dict(zip(colnames, dtypes)), na_values=[' '], nrows=13743)
+df = load_cached_csv(inputFile, usecols=usecols,
+                     dtype=dict(zip(colnames, dtypes)), na_values=[' '],
+                     nrows=13743)
 colrenames = {'DISTURBANCE_ID': 'num',
               'TM': 'datetime',
               'LON': 'lon', 'LAT': 'lat',
@@ -78,30 +121,36 @@ colrenames = {'DISTURBANCE_ID': 'num',
 df.rename(colrenames, axis=1, inplace=True)
 
 df['datetime'] = pd.to_datetime(df.datetime, format="%Y-%m-%d %H:%M", errors='coerce')
-df['year'] = pd.DatetimeIndex(df['datetime']).year
-df['month'] = pd.DatetimeIndex(df['datetime']).month
+df['year'] = df['datetime'].dt.year
+df['month'] = df['datetime'].dt.month
 
 df = df[df.vmax.notnull()]
 obstc = filter_tracks_domain(df, 90, 160, -35, -5)
 
 obstc['deltaT'] = obstc.datetime.diff().dt.total_seconds().div(3600, fill_value=0)
-idx = obstc.num.values
-varidx = np.ones(len(idx))
-varidx[1:][idx[1:] == idx[:-1]] = 0
-speed, bearing = getSpeedBearing(varidx, obstc.lon.values, obstc.lat.values, obstc.deltaT.values)
-speed[varidx == 1] = 0
+# Flag the first record of each TC
+num = obstc['num'].to_numpy()
+varidx = np.ones(len(num), dtype=bool)
+np.not_equal(num[1:], num[:-1], out=varidx[1:])
+speed, bearing = speed_bearing(varidx, obstc.lon.values, obstc.lat.values, obstc.deltaT.values)
 obstc['speed'] = speed
 
-lmidf = obstc.loc[obstc.groupby(["num"])["vmax"].idxmax()]
-
-lmidf['lmidt'] = pd.to_datetime(obstc.loc[obstc.groupby(["num"])["vmax"].idxmax()]['datetime'])
-lmidf['lmidtyear'] = pd.DatetimeIndex(lmidf['lmidt']).year
-lmidf['startdt'] = pd.to_datetime(obstc.loc[obstc.index.to_series().groupby(obstc['num']).first().reset_index(name='idx')['idx']]['datetime']).values
+# Index of the LMI record and the first record of each TC, both in order of
+# first appearance of each TC in the data:
+lmi_idx = obstc.groupby('num', sort=False)['vmax'].idxmax().values
+first_idx = obstc.index[~obstc['num'].duplicated()]
+lmidf = obstc.loc[lmi_idx].copy()
+firstdf = obstc.loc[first_idx]
+
+# The datetime column has already been converted, so no further parsing:
+lmidf['lmidt'] = lmidf['datetime']
+lmidf['lmidtyear'] = lmidf['datetime'].dt.year
+lmidf['startdt'] = firstdf['datetime'].values
 lmidf['lmitelapsed'] = (lmidf.lmidt - lmidf.startdt).dt.total_seconds()/3600.
-lmidf['initlat'] = obstc.loc[obstc.index.to_series().groupby(obstc['num']).first().reset_index(name='idx')['idx']]['lat'].values
-lmidf['initlon'] = obstc.loc[obstc.index.to_series().groupby(obstc['num']).first().reset_index(name='idx')['idx']]['lon'].values
-lmidf['lmilat'] = obstc.loc[obstc.groupby(["num"])["vmax"].idxmax()]['lat']
-lmidf['lmilon'] = obstc.loc[obstc.groupby(["num"])["vmax"].idxmax()]['lon']
+lmidf['initlat'] = firstdf['lat'].values
+lmidf['initlon'] = firstdf['lon'].values
+lmidf['lmilat'] = lmidf['lat']
+lmidf['lmilon'] = lmidf['lon']
 
 lmidf.to_csv(pjoin(outputPath, "OTCR.lmi.20210810.csv"), index=False, date_format=DATEFMT)
 
@@ -13,7 +13,7 @@ import cartopy.feature as cfeature
 dataPath = "X:/georisk/HaRIA_B_Wind/data/raw/from_bom/2022/1-minute"
 tempPath = "C:/WorkSpace/temp"
 ziplist = os.listdir(dataPath)
-pattern = re.compile(".*StnDet.*\.txt")
+pattern = re.compile(r"StnDet.*\.txt")
 
 stnfiles = []
 for z in ziplist:
@@ -22,7 +22,7 @@ for z in ziplist:
         zz = zipfile.ZipFile(filename)
         filelist = zz.namelist()
         for f in filelist:
-            if pattern.match(f):
+            if pattern.search(basename(f)):
                 stnfiles.append(zz.extract(f, path=tempPath))
 
 
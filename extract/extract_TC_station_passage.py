@@ -23,16 +23,19 @@ recorded in the files.
 
 """
 import os
+import math
 import logging
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 from datetime import timedelta
 
-import matplotlib.pyplot as plt
-from shapely.geometry import LineString
-from shapely.geometry import box as sbox
-from vincenty import vincenty
+import shapely
+from numba import njit, prange
+
+from parquetcache import load_cached
 
 logger = logging.getLogger()
 
@@ -42,19 +45,102 @@ TZ = {"QLD": 10, "NSW": 10, "VIC": 10,
       "TAS": 10, "SA": 9.5, "NT": 9.5,
       "WA": 8, "ANT": 0}
 
+# WGS84 ellipsoid, as used by the `vincenty` package
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = 6356752.314245
+VINCENTY_MAX_ITERATIONS = 200
+VINCENTY_CONVERGENCE = 1e-12
+
+
+@njit(parallel=True, cache=True)
+def vincenty_distance(lat1, lon1, lat2, lon2):
+    """
+    Calculate the geodesic distance between pairs of points on the WGS84
+    ellipsoid using Vincenty's inverse formula. This is a compiled, array
+    version of `vincenty.vincenty` and gives the same results.
+
+    :param lat1: `numpy.ndarray` of latitudes of the first points
+    :param lon1: `numpy.ndarray` of longitudes of the first points
+    :param lat2: `numpy.ndarray` of latitudes of the second points
+    :param lon2: `numpy.ndarray` of longitudes of the second points
+
+    :returns: `numpy.ndarray` of distances (km). NaN where the formula does
+              not converge (nearly antipodal points).
+    """
+    n = len(lat1)
+    dist = np.empty(n)
+    for i in prange(n):
+        if lat1[i] == lat2[i] and lon1[i] == lon2[i]:
+            dist[i] = 0.
+            continue
+        U1 = math.atan((1 - WGS84_F) * math.tan(math.radians(lat1[i])))
+        U2 = math.atan((1 - WGS84_F) * math.tan(math.radians(lat2[i])))
+        L = math.radians(lon2[i] - lon1[i])
+        sinU1 = math.sin(U1)
+        cosU1 = math.cos(U1)
+        sinU2 = math.sin(U2)
+        cosU2 = math.cos(U2)
+
+        lam = L
+        sinSigma = cosSigma = sigma = cosSqAlpha = cos2SigmaM = 0.
+        converged = False
+        for _ in range(VINCENTY_MAX_ITERATIONS):
+            sinLam = math.sin(lam)
+            cosLam = math.cos(lam)
+            sinSigma = math.sqrt((cosU2 * sinLam) ** 2 +
+                                 (cosU1 * sinU2 - sinU1 * cosU2 * cosLam) ** 2)
+            if sinSigma == 0:
+                break
+            cosSigma = sinU1 * sinU2 + cosU1 * cosU2 * cosLam
+            sigma = math.atan2(sinSigma, cosSigma)
+            sinAlpha = cosU1 * cosU2 * sinLam / sinSigma
+            cosSqAlpha = 1 - sinAlpha ** 2
+            if cosSqAlpha != 0:
+                cos2SigmaM = cosSigma - 2 * sinU1 * sinU2 / cosSqAlpha
+            else:
+                cos2SigmaM = 0.
+            C = WGS84_F / 16 * cosSqAlpha * (4 + WGS84_F * (4 - 3 * cosSqAlpha))
+            lamPrev = lam
+            lam = L + (1 - C) * WGS84_F * sinAlpha * (
+                sigma + C * sinSigma * (
+                    cos2SigmaM + C * cosSigma * (-1 + 2 * cos2SigmaM ** 2)))
+            if abs(lam - lamPrev) < VINCENTY_CONVERGENCE:
+                converged = True
+                break
+
+        if sinSigma == 0:
+            # Coincident points
+            dist[i] = 0.
+            continue
+        if not converged:
+            dist[i] = np.nan
+            continue
+
+        uSq = cosSqAlpha * (WGS84_A ** 2 - WGS84_B ** 2) / (WGS84_B ** 2)
+        A = 1 + uSq / 16384 * (4096 + uSq * (-768 + uSq * (320 - 175 * uSq)))
+        B = uSq / 1024 * (256 + uSq * (-128 + uSq * (74 - 47 * uSq)))
+        deltaSigma = B * sinSigma * (
+            cos2SigmaM + B / 4 * (
+                cosSigma * (-1 + 2 * cos2SigmaM ** 2) -
+                B / 6 * cos2SigmaM * (-3 + 4 * sinSigma ** 2) *
+                (-3 + 4 * cos2SigmaM ** 2)))
+        dist[i] = round(WGS84_B * A * (sigma - deltaSigma) / 1000., 6)
+    return dist
+
 
 def filter_tracks_domain(df, minlon=90, maxlon=180, minlat=-40, maxlat=0):
     """
-    Takes a `DataFrame` and filters on the basis of whether the track interscts
-    the given domain, which is specified by the minimum and maximum longitude
-    and latitude.
+    Takes a `DataFrame` and filters on the basis of whether any point of the
+    track lies within the given domain, which is specified by the minimum and
+    maximum longitude and latitude.
 
     NOTE: This assumes the tracks and bounding box are in the same geographic
     coordinate system (i.e. generally a latitude-longitude coordinate system).
     It will NOT support different projections (e.g. UTM data for the bounds and
     geographic for the tracks).
 
-    NOTE: This doesn't work if there is only one point for the track.
+    NOTE: Tracks with only one point are excluded.
 
     :param df: :class:`pandas.DataFrame` that holds the TCLV data
     :param float minlon: minimum longitude of the bounding box
@@ -65,11 +151,10 @@ def filter_tracks_domain(df, minlon=90, maxlon=180, minlat=-40, maxlat=0):
     :returns: :class:`pd.DataFrame` of tracks that pass through the given box.
     """
     logger.info("Filtering tracks to the given domain")
-    domain = sbox(minlon, minlat, maxlon, maxlat, ccw=False)
-    tracks = df.groupby('num')
-    tempfilter = tracks.filter(lambda x: len(x) > 1)
-    filterdf = tempfilter.groupby('num').filter(
-        lambda x: LineString(zip(x['lon'], x['lat'])).intersects(domain))
+    inside = df.lon.between(minlon, maxlon) & df.lat.between(minlat, maxlat)
+    anyinside = inside.groupby(df['num']).transform('any')
+    npoints = df.groupby('num')['num'].transform('size')
+    filterdf = df[anyinside & (npoints > 1)]
     return filterdf
 
 
@@ -78,6 +163,25 @@ def load_obs_tracks(trackfile: str, format: str) -> gpd.GeoDataFrame:
     Load track data from IBTrACS file, add geometry and CRS. Basic
     categorisation using minimum central pressure is applied.
 
+    The processed tracks are saved to a GeoParquet file alongside the track
+    file, and reused on later runs while it is newer than the track file.
+
+    :param str trackfile: Path to BoM best track data file
+    :param str format: Whether its a raw or QC'd BoM best track file
+
+    :returns: :class:`geopandas.GeoDataFrame`
+    """
+    cachefile = f"{os.path.splitext(trackfile)[0]}.{format}.parquet"
+    return load_cached(trackfile, cachefile,
+                       lambda f: read_tracks(f, format),
+                       reader=gpd.read_parquet)
+
+
+def read_tracks(trackfile: str, format: str) -> gpd.GeoDataFrame:
+    """
+    Read track data from a BoM best track file and build the track segments.
+    See `load_obs_tracks`.
+
     :param str trackfile: Path to BoM best track data file
     :param str format: Whether its a raw or QC'd BoM best track file
 
@@ -112,41 +216,46 @@ def load_obs_tracks(trackfile: str, format: str) -> gpd.GeoDataFrame:
                          dtype=dict(zip(colnames, dtypes)),
                          na_values=[' '],)
 
-    df['datetime'] = pd.to_datetime(
-        df.datetime, format="%Y-%m-%d %H:%M", errors='coerce')
+    # Filter before doing any other work on the records, so only tracks in the
+    # domain are carried through to datetime parsing and segment construction
     obstc = filter_tracks_domain(df)
 
-    trackgdf = []
-    for k, t in obstc.groupby('num'):
-        segments = []
-        for n in range(len(t.num) - 1):
-            segment = LineString([[t.lon.iloc[n], t.lat.iloc[n]],
-                                  [t.lon.iloc[n+1], t.lat.iloc[n+1]]])
-            segments.append(segment)
-
-        gdf = gpd.GeoDataFrame.from_records(t[:-1])
-        gdf['geometry'] = segments
-        gdf['category'] = pd.cut(gdf['pmin'],
-                                 bins=[0, 930, 955, 970, 985, 990, 1020],
-                                 labels=[5, 4, 3, 2, 1, 0])
-        trackgdf.append(gdf)
-
-    trackgdf = pd.concat(trackgdf)
+    # Each point that is followed by another point of the same track starts a
+    # segment. Build all segments in one call, from an array of (start, end)
+    # coordinate pairs with shape (nsegments, 2, 2)
+    num = obstc['num'].to_numpy()
+    lon = obstc['lon'].to_numpy()
+    lat = obstc['lat'].to_numpy()
+    start = np.flatnonzero(num[:-1] == num[1:])
+    end = start + 1
+    coords = np.stack([np.column_stack([lon[start], lat[start]]),
+                       np.column_stack([lon[end], lat[end]])],
+                      axis=1)
+    trackgdf = gpd.GeoDataFrame(obstc.iloc[start])
+    trackgdf['datetime'] = pd.to_datetime(
+        trackgdf.datetime, format="%Y-%m-%d %H:%M", errors='coerce')
+    trackgdf['geometry'] = shapely.linestrings(coords)
+    # Categorise on central pressure with a lookup on the (right-closed) bin
+    # index. Pressures outside the bins, or missing, have no category
+    bins = np.array([0, 930, 955, 970, 985, 990, 1020])
+    labels = np.array([np.nan, 5, 4, 3, 2, 1, 0, np.nan])
+    binidx = np.searchsorted(bins, trackgdf['pmin'].to_numpy(), side='left')
+    trackgdf['category'] = pd.Series(labels[binidx], index=trackgdf.index,
+                                     dtype='Int8')
+
     # WGS84 for IBTrACS - double check!
     trackgdf = trackgdf.set_crs("EPSG:4326")
     return trackgdf
 
 
-def load_stations(stationfile: str, dist: float) -> gpd.GeoDataFrame:
+def load_stations(stationfile: str) -> gpd.GeoDataFrame:
     """
-    Load weather station locations from a file, add geometry and a buffer to
+    Load weather station locations from a file and add point geometry to
     each feature.
 
     We put the station data into GDA 2020
 
     :param stationfile: Path to the station file
-    :param dist: Buffer distance around each station - needs to be in the same
-    units as the station coordinates (i.e. probably degrees)
     """
     logger.info(f"Loading stations from {stationfile}")
     colnames = ["id", 'stnNum', 'rainfalldist', 'stnName', 'stnOpen',
@@ -161,7 +270,7 @@ def load_stations(stationfile: str, dist: float) -> gpd.GeoDataFrame:
     gdf = gpd.GeoDataFrame(df,
                            geometry=gpd.points_from_xy(
                                df.stnLon, df.stnLat,
-                               crs="EPSG:7844").buffer(dist)
+                               crs="EPSG:7844")
                            )
     gdf.set_index('stnNum', drop=False, inplace=True)
     return gdf
@@ -171,6 +280,10 @@ def load_obs_data(stationFile: str, stnState: str) -> pd.DataFrame:
     """
     Load observations for a given station
 
+    The parsed observations (local time) are saved to a Parquet file
+    alongside the station file, and reused on later runs while it is newer
+    than the station file.
+
     :param str stationFile: path to a file containing formatted daily
     observations of the maximum wind gust and the corresponding present
     and past weather conditions
@@ -182,6 +295,28 @@ def load_obs_data(stationFile: str, stnState: str) -> pd.DataFrame:
     converted to UTC. Any records with missing/null maximum daily gust values
     are eliminated.
     """
+    cachefile = f"{os.path.splitext(stationFile)[0]}.parquet"
+    df = load_cached(stationFile, cachefile, read_obs_file)
+
+    # Change local time to UTC time. Have to assume we're not working with
+    # DLS times - would be somewhat complex to determine, since some states
+    # actually went thru periods of having DLS, but typically don't!
+    df['datetime'] = df.datetime - timedelta(hours=TZ[stnState])
+    # Drop rows with no gust observation
+    df = df[~df.gust.isna()]
+    return df
+
+
+def read_obs_file(stationFile: str) -> pd.DataFrame:
+    """
+    Read a formatted daily observation file. Datetimes are in local time.
+
+    :param str stationFile: path to a file containing formatted daily
+    observations of the maximum wind gust and the corresponding present
+    and past weather conditions
+
+    :returns: `pd.DataFrame` containing the observations
+    """
     logger.info(f"Loading {stationFile}")
     colnames = ["dc", "stnNum", "Year", "Month", "Day",
                 "gust", "gust_q", "direction", "direction_q", "time", "time_q",
@@ -192,24 +327,31 @@ def load_obs_data(stationFile: str, stnState: str) -> pd.DataFrame:
                 "pastwx12", "Qpastwx12", "pastwx15", "Qpastwx15", "pastwx18", "Qpastwx18",
                 "pastwx21", "Qpastwx21", "Null"]
 
-    dtypes = [str, str, str, str, str, float, str, float, str, str, str,
-              float, str, float, str, float, str, float, str, float, str,
-              float, str, float, str, float, str, float, str, float, str,
-              float, str, float, str, float, str, float, str, float, str,
-              float, str, ]
+    # Only the date/time, gust and direction fields are used, so skip parsing
+    # the present/past weather columns. This relies on the C engine: the
+    # pyarrow engine can't select named columns when `names` replaces the
+    # file's header row
+    usecols = ["Year", "Month", "Day", "time",
+               "gust", "gust_q", "direction", "direction_q"]
+    # Quality flags only take a handful of values, so store them as
+    # categoricals rather than a Python string per row
+    dtypes = {col: 'category' for col in usecols if col.endswith('_q')}
     df = pd.read_csv(stationFile, names=colnames, sep=",", index_col=False,
-                     header=0, parse_dates={'datetime': [2, 3, 4, 9]},
+                     header=0, usecols=usecols, dtype=dtypes,
                      na_values=['', '     '], keep_default_na=False)
-    # Change local time to UTC time. Have to assume we're not working with
-    # DLS times - would be somewhat complex to determine, since some states
-    # actually went thru periods of having DLS, but typically don't!
-    df['datetime'] = df.datetime - timedelta(hours=TZ[stnState])
-    # Drop rows with no gust observation
-    df = df[~df.gust.isna()]
+    # Build the datetime from the integer date/time columns in one go, rather
+    # than having read_csv join them into strings and parse each row. A
+    # missing time of gust still keeps the date (at 00:00)
+    hhmm = pd.to_numeric(df['time'], errors='coerce').fillna(0)
+    df.insert(0, 'datetime', pd.to_datetime(
+        dict(year=df.Year, month=df.Month, day=df.Day,
+             hour=hhmm // 100, minute=hhmm % 100)))
+    df.drop(columns=['Year', 'Month', 'Day', 'time'], inplace=True)
     return df
 
 
-def calculateCPA(stationFile: str, trackFile: str, trackFormat: str) -> pd.DataFrame:
+def calculateCPA(stationFile: str, trackFile: str, trackFormat: str,
+                 dist: float = 2.) -> pd.DataFrame:
     """
     Calculate the closest point of approach to each station for each cyclone.
 
@@ -219,97 +361,152 @@ def calculateCPA(stationFile: str, trackFile: str, trackFormat: str) -> pd.DataF
     :param str trackFile: Full path to the best track data
     :param str trackFormat: either "raw" or "QC". Indicates which best track
         data to load
+    :param float dist: Search distance around each station for track
+        segments - in the same units as the coordinates (i.e. degrees)
 
     :returns: `pd.DataFrame` with the datetime of each instance of a cyclone
         passage, along with distance, central pressure and poci of the storm at
         the time of CPA.
     """
     tracks = load_obs_tracks(trackFile, trackFormat)
-    stations = load_stations(stationFile, 2)
-    stations.set_index('stnNum', drop=False, inplace=True)
-    selected = gpd.overlay(tracks, stations.to_crs(
-        tracks.crs), how='intersection')
-    selected['cpa'] = selected.apply(lambda x: vincenty(
-        (x['lat'], x['lon']), (x['stnLat'], x['stnLon'])), axis=1)
+    stations = load_stations(stationFile).to_crs(tracks.crs)
+    # Find every track segment/station pair within `dist` of each other with a
+    # spatial index query on the station points, rather than intersecting the
+    # segments with buffered stations. The geometry isn't used from here on -
+    # CPA is calculated from the coordinate columns - so carry on with a plain
+    # DataFrame
+    stnidx, trackidx = tracks.sindex.query(stations.geometry,
+                                           predicate='dwithin', distance=dist)
+    selected = pd.concat(
+        [pd.DataFrame(tracks.drop(columns='geometry'))
+         .iloc[trackidx].reset_index(drop=True),
+         pd.DataFrame(stations.drop(columns='geometry'))
+         .iloc[stnidx].reset_index(drop=True)],
+        axis=1)
+    selected['cpa'] = vincenty_distance(
+        selected['lat'].to_numpy(dtype=float),
+        selected['lon'].to_numpy(dtype=float),
+        selected['stnLat'].to_numpy(dtype=float),
+        selected['stnLon'].to_numpy(dtype=float))
     # Closest point of approach (CPA)
     stncpa = selected.loc[selected.groupby(['stnNum', 'num']).cpa.idxmin()]
     stncpa = stncpa.loc[stncpa.cpa < 250.]
-    stncpa.drop('geometry', axis=1, inplace=True)
     stncpa.to_csv(
         r"X:\georisk\HaRIA_B_Wind\data\derived\tcobs\stncpa.csv", index=False)
     return stncpa
 
 
-def extractObs(cpadf: pd.DataFrame, stations: pd.DataFrame) -> pd.DataFrame:
-    outdf = pd.DataFrame(columns=['stnNum', 'stnName', 'dtObs', 'gust', 'gustq',
-                                  'direction', 'dtTC', 'TCName', 'TCIDnum',
-                                  'TCCPA'])
-    cpagroup = cpadf.groupby('stnNum')
-    for stnNum, group in cpagroup:
-        # Load the data - need the state to determine offset from UTC
-        stnState = stations.loc[stnNum, 'stnState'].strip()
-        stnName = stations.loc[stnNum, 'stnName']
-        dataFile = os.path.join(
-            stationPath, f"DC02D_Data_{stnNum:06d}_999999999632559.txt")
-        obsData = load_obs_data(dataFile, stnState)
-        if obsData.empty:
-            print(f"No station observation data for {stnNum}")
-            continue
+def extractStationObs(stnNum: int, group: pd.DataFrame, stnState: str,
+                      stnName: str, dataFile: str) -> pd.DataFrame:
+    """
+    Extract the maximum daily gust observed around the time of CPA for each
+    cyclone passage at a single station.
 
-        obsData.set_index('datetime', inplace=True, drop=False)
-        for idx, tc in group.iterrows():
-            # First find the index of the obs data closest to the time of CPA
-            try:
-                indx = obsData.index.get_loc(
-                    tc.datetime, method='nearest', tolerance=pd.Timedelta('1D'))
-            except KeyError:
-                print(
-                    f"No obs within 1 day of {tc.datetime} at {stnNum} for {tc.NAME}")
-                continue
-
-            # Redundant?
-            if indx == -1:
-                breakpoint()
-            if indx == 0:
-                # No records:
-                continue
-
-            # Select the records either side of the selected time - maximum wind
-            # gust may have occured on previous or following day compared to the
-            # time of CPA (e.g. CPA at 01:00, but highest gust at 23:00 previous
-            # day)
-            obsgrp = obsData.iloc[indx-1:indx+2]
-            # Now take the max value of those records:
-            obs = obsgrp.loc[obsgrp['gust'].idxmax()]
-
-            if obs.gust is not None:
-                print(stnNum, obs.datetime, obs.gust,
-                      obs.direction, tc.datetime, tc.NAME, tc.cpa)
-                outdf = outdf.append(
-                    pd.DataFrame([[stnNum, stnName, obs.datetime, obs.gust, obs.gust_q, obs.direction, tc.datetime, tc.NAME, tc.num, tc.cpa]],
-                                 columns=['stnNum', 'stnName', 'dtObs', 'gust', 'gustq', 'direction', 'dtTC', 'TCName', 'TCIDnum', 'TCCPA']),
-                    ignore_index=True)
-    return outdf
+    :param int stnNum: Station number
+    :param group: `pd.DataFrame` of the CPA records for the station
+    :param str stnState: abbreviated state name for the station
+    :param str stnName: Station name
+    :param str dataFile: Path to the daily observation file for the station
 
+    :returns: `pd.DataFrame` with one record per cyclone passage that has a
+        gust observation
+    """
+    columns = ['stnNum', 'stnName', 'dtObs', 'gust', 'gustq', 'direction',
+               'dtTC', 'TCName', 'TCIDnum', 'TCCPA']
+    # Load the data - need the state to determine offset from UTC
+    obsData = load_obs_data(dataFile, stnState)
+    # Records without a valid date can't be matched to a passage, and
+    # merge_asof rejects null keys
+    obsData = obsData[obsData['datetime'].notna()]
+    if obsData.empty:
+        print(f"No station observation data for {stnNum}")
+        return pd.DataFrame(columns=columns)
+
+    obsData = obsData.sort_values('datetime', ignore_index=True)
+    obsData['datetime'] = obsData['datetime'].astype('datetime64[ns]')
+
+    # Maximum wind gust may have occured on previous or following day compared
+    # to the time of CPA (e.g. CPA at 01:00, but highest gust at 23:00 previous
+    # day). For each record, find the position of the highest gust among the
+    # record and the records either side of it. Ties go to the earliest
+    # record, as with idxmax.
+    gust = obsData['gust'].to_numpy(dtype=float)
+    window = np.vstack([np.r_[-np.inf, gust[:-1]], gust,
+                        np.r_[gust[1:], -np.inf]])
+    maxpos = np.arange(len(gust)) + np.argmax(window, axis=0) - 1
+
+    # Find the record closest to the time of CPA of every cyclone at once
+    tcs = group.assign(tcorder=np.arange(len(group)))
+    tcs = tcs[tcs['datetime'].notna()].astype({'datetime': 'datetime64[ns]'})
+    obspos = pd.DataFrame({'datetime': obsData['datetime'],
+                           'obspos': np.arange(len(obsData))})
+    nearest = pd.merge_asof(tcs.sort_values('datetime'), obspos,
+                            on='datetime', direction='nearest',
+                            tolerance=pd.Timedelta('1D'))
+    for tc in nearest[nearest['obspos'].isna()].itertuples():
+        print(f"No obs within 1 day of {tc.datetime} at {stnNum} for {tc.NAME}")
+
+    # Passages matched to the first record are skipped
+    nearest = nearest[nearest['obspos'] > 0].sort_values('tcorder')
+    obs = obsData.iloc[maxpos[nearest['obspos'].to_numpy(dtype=int)]]
+    return pd.DataFrame({'stnNum': stnNum,
+                         'stnName': stnName,
+                         'dtObs': obs['datetime'].to_numpy(),
+                         'gust': obs['gust'].to_numpy(),
+                         'gustq': obs['gust_q'].to_numpy(),
+                         'direction': obs['direction'].to_numpy(),
+                         'dtTC': nearest['datetime'].to_numpy(),
+                         'TCName': nearest['NAME'].to_numpy(),
+                         'TCIDnum': nearest['num'].to_numpy(),
+                         'TCCPA': nearest['cpa'].to_numpy()},
+                        columns=columns)
 
-stationPath = r"X:\georisk\HaRIA_B_Wind\data\raw\from_bom\2019\Daily"
-stationFile = os.path.join(stationPath, "DC02D_StnDet_999999999632559.txt")
-trackFile = r"X:\georisk\HaRIA_B_Wind\data\raw\from_bom\tc\IDCKMSTM0S - 20210722.csv"
 
-stncpa = calculateCPA(stationFile, trackFile, 'raw')
-stations = load_stations(stationFile, 2)
-outdf = extractObs(stncpa, stations)
-tdiff = abs(outdf.dtObs - outdf.dtTC)
+def extractObs(cpadf: pd.DataFrame, stations: pd.DataFrame) -> pd.DataFrame:
+    """
+    Extract the observed gusts for each cyclone passage. Stations are
+    independent of each other, so they are processed in parallel.
 
-# Remove any obs where the time difference between CPA and the obs is greater than 36 hours
-outdf = outdf[tdiff < pd.Timedelta('36h')]
-outdf.to_csv(
-    r"X:\georisk\HaRIA_B_Wind\data\derived\tcobs\stncpa_obs.csv", index=False)
+    :param cpadf: `pd.DataFrame` of CPA records, from `calculateCPA`
+    :param stations: `pd.DataFrame` of station details, indexed by station
+        number
 
+    :returns: `pd.DataFrame` with one record per cyclone passage that has a
+        gust observation
+    """
+    with ProcessPoolExecutor() as executor:
+        futures = []
+        for stnNum, group in cpadf.groupby('stnNum'):
+            stnState = stations.loc[stnNum, 'stnState'].strip()
+            stnName = stations.loc[stnNum, 'stnName']
+            dataFile = os.path.join(
+                stationPath, f"DC02D_Data_{stnNum:06d}_999999999632559.txt")
+            futures.append(executor.submit(extractStationObs, stnNum, group,
+                                           stnState, stnName, dataFile))
+        if not futures:
+            return pd.DataFrame(columns=['stnNum', 'stnName', 'dtObs', 'gust',
+                                         'gustq', 'direction', 'dtTC',
+                                         'TCName', 'TCIDnum', 'TCCPA'])
+        outdf = pd.concat([f.result() for f in futures], ignore_index=True)
+    return outdf
 
-for stnNum, obs in outdf.groupby('stnNum'):
-    if len(obs) > 10:
-        print(stnNum, stations.loc[stnNum, 'stnName'], len(obs))
-        obs.to_csv(os.path.join(r"X:\georisk\HaRIA_B_Wind\data\derived\tcobs", f"tcobs_{stnNum:06d}.csv"), index=False)
 
+stationPath = r"X:\georisk\HaRIA_B_Wind\data\raw\from_bom\2019\Daily"
+stationFile = os.path.join(stationPath, "DC02D_StnDet_999999999632559.txt")
+trackFile = r"X:\georisk\HaRIA_B_Wind\data\raw\from_bom\tc\IDCKMSTM0S - 20210722.csv"
 
+if __name__ == "__main__":
+    stncpa = calculateCPA(stationFile, trackFile, 'raw')
+    stations = load_stations(stationFile)
+    outdf = extractObs(stncpa, stations)
+    tdiff = abs(outdf.dtObs - outdf.dtTC)
+
+    # Remove any obs where the time difference between CPA and the obs is greater than 36 hours
+    outdf = outdf[tdiff < pd.Timedelta('36h')]
+    outdf.to_csv(
+        r"X:\georisk\HaRIA_B_Wind\data\derived\tcobs\stncpa_obs.csv", index=False)
+
+    for stnNum, obs in outdf.groupby('stnNum'):
+        if len(obs) > 10:
+            print(stnNum, stations.loc[stnNum, 'stnName'], len(obs))
+            obs.to_csv(os.path.join(r"X:\georisk\HaRIA_B_Wind\data\derived\tcobs", f"tcobs_{stnNum:06d}.csv"), index=False)
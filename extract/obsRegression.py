@@ -164,16 +164,32 @@ stations['rasd'] = 0
 
 varname = "fg10"
 
-obsfilelist = os.listdir(obspath)
-reanfilelist = os.listdir(reanpath)
+# Index the data files by the station numbers in their names. Observation
+# files use a zero-padded, six-digit station number. The first file listed
+# for a station is used
+digits = re.compile(r"\d+")
+obsfiles = {}
+for f in os.listdir(obspath):
+    for num in digits.findall(f):
+        if len(num) == 6:
+            obsfiles.setdefault(int(num), f)
+reanfiles = {}
+for f in os.listdir(reanpath):
+    for num in digits.findall(f):
+        reanfiles.setdefault(int(num), f)
+
+# One figure is reused for every station time series plot - it is cleared
+# rather than closed between stations
+tsfig, tsax = plt.subplots(figsize=(12, 4))
+# Results for each station, keyed by station number. These are assigned to
+# the station table in one go after the loop
+results = {}
 for idx, stn in stations.iterrows():
     station = stn.stnNum
     stationName = stn.stnName
     print(f"Processing {station} ({stationName})")
-    r = re.compile(rf".*{station:06d}.*")
-    s = re.compile(rf".*{station}.*")
-    obsfile = list(filter(r.match, obsfilelist))[0]
-    reanfile = list(filter(s.match, reanfilelist))[0]
+    obsfile = obsfiles[station]
+    reanfile = reanfiles[station]
 
     obsdatafile = pjoin(obspath, obsfile)
     reandatafile = pjoin(reanpath, reanfile)
@@ -182,7 +198,7 @@ for idx, stn in stations.iterrows():
     obsdf = obsdf[(obsdf['windgustq'] == 'Y') &
                   (obsdf['windgust'] > 0.0)]
     if len(obsdf) < (365 * 5): # minimum 5 years observations (excluding any gaps)
-        stations.loc[stations.stnNum==station, 'nobs'] = len(obsdf)
+        results[station] = {'nobs': len(obsdf)}
         print("Insufficient observations")
         continue
     reands = xr.open_dataset(reandatafile)
@@ -192,19 +208,18 @@ for idx, stn in stations.iterrows():
 
     jointdf[varname] = jointdf[varname] * 3.6
 
-    fig, ax = plt.subplots(figsize=(12, 4))
-    plt.plot(reandf.time, reandf[varname]*3.6, alpha=0.5, label="Reanalysis")
-    plt.plot(pd.to_datetime(obsdf.date), obsdf.windgust, alpha=0.5, label="Observations")
-    ax.xaxis.set_major_locator(locator)
-    ax.xaxis.set_major_formatter(formatter)
-    ax.grid(True)
-    ax.legend(loc='upper left')
-    ax.set_xlim(datetime(2000, 1, 1), datetime(2021, 4, 30))
-    ax.set_title(f"Observed and reanalysis daily maximum wind gust - station {station}")
-    ax.set_xlabel("Date")
-    ax.set_ylabel("Gust wind speed [km/h]")
-    plt.savefig(pjoin(outputPath, f"ts.{station:06d}.png"), bbox_inches='tight')
-    plt.close(fig)
+    tsax.clear()
+    tsax.plot(reandf.time, reandf[varname]*3.6, alpha=0.5, label="Reanalysis")
+    tsax.plot(pd.to_datetime(obsdf.date), obsdf.windgust, alpha=0.5, label="Observations")
+    tsax.xaxis.set_major_locator(locator)
+    tsax.xaxis.set_major_formatter(formatter)
+    tsax.grid(True)
+    tsax.legend(loc='upper left')
+    tsax.set_xlim(datetime(2000, 1, 1), datetime(2021, 4, 30))
+    tsax.set_title(f"Observed and reanalysis daily maximum wind gust - station {station}")
+    tsax.set_xlabel("Date")
+    tsax.set_ylabel("Gust wind speed [km/h]")
+    tsfig.savefig(pjoin(outputPath, f"ts.{station:06d}.png"), bbox_inches='tight')
     ax = sns.lmplot(data=jointdf, x='windgust', y=varname, scatter_kws={'alpha':0.25})
     x_fit = sm.add_constant(jointdf.windgust)
     fit = sm.OLS(jointdf[varname], x_fit).fit()
@@ -215,22 +230,27 @@ for idx, stn in stations.iterrows():
     #ax.ax.text(0.1, 0.9, rf"$R^2 = ${np.round(fit.rsquared, 4)}", transform=ax.ax.transAxes)
     #ax.ax.text(0.1, 0.85, f"n = {len(obsdf)}", transform=ax.ax.transAxes)
     #plt.savefig(pjoin(outputPath, f"regplot.{station:06d}.png"), bbox_inches='tight')
-    stations.loc[stations.stnNum==station, 'rsq'] = fit.rsquared
-    stations.loc[stations.stnNum==station, 'nobs'] = len(obsdf)
-    stations.loc[stations.stnNum==station, 'm'] = fit.params.windgust
-    stations.loc[stations.stnNum==station, 'b'] = fit.params.const
-    stations.loc[stations.stnNum==station, 'obssd'] = obsdf.windgust.std()
-    stations.loc[stations.stnNum==station, 'rasd'] = jointdf[varname].std()
-
-    # Add upper/lower confidence interval on the fitted regression line:
-    stations.loc[stations.stnNum==station, 'bcil'] = ci[0].const
-    stations.loc[stations.stnNum==station, 'bciu'] = ci[1].const
-    stations.loc[stations.stnNum==station, 'mcil'] = ci[0].windgust
-    stations.loc[stations.stnNum==station, 'mciu'] = ci[1].windgust
-
-    plt.close('all')
+    results[station] = {'rsq': fit.rsquared,
+                        'nobs': len(obsdf),
+                        'm': fit.params.windgust,
+                        'b': fit.params.const,
+                        'obssd': obsdf.windgust.std(),
+                        'rasd': jointdf[varname].std(),
+                        # Upper/lower confidence interval on the fitted
+                        # regression line:
+                        'bcil': ci[0].const,
+                        'bciu': ci[1].const,
+                        'mcil': ci[0].windgust,
+                        'mciu': ci[1].windgust}
+
+    plt.close(ax.figure)
     gc.collect()
 
+plt.close(tsfig)
+resultdf = pd.DataFrame.from_dict(results, orient='index')
+for col in resultdf.columns:
+    stations[col] = stations['stnNum'].map(resultdf[col]).fillna(stations[col])
+
 breakpoint()
 stations.to_file(pjoin(outputPath, 'stationlist.shp'))
 pd.DataFrame(stations.drop(columns='geometry')).to_csv(pjoin(outputPath, 'stationlist.csv'))
@@ -0,0 +1,84 @@
+"""
+parquetcache.py - reuse parsed copies of slow-to-read data files
+
+The parsed data are saved to a Parquet file alongside the source file, and
+reused on later runs while the Parquet file is newer than the source file.
+Editing (or replacing) the source file makes the copy stale, and it is
+rebuilt on the next run. The cache is only an optimisation: an unreadable
+copy is rebuilt from the source file, and a copy that can't be written is
+skipped.
+
+"""
+import os
+import logging
+import hashlib
+from os.path import isfile, getmtime, splitext
+
+import pandas as pd
+
+logger = logging.getLogger()
+
+
+def load_cached(srcfile, cachefile, loader, reader=pd.read_parquet):
+    """
+    Load data from a file, using a Parquet copy of the parsed data if one
+    exists and is newer than the file.
+
+    :param str srcfile: Path to the source data file
+    :param str cachefile: Path to the Parquet copy of the parsed data
+    :param loader: Function that takes `srcfile` and returns a
+                   `pandas.DataFrame` of the parsed data
+    :param reader: Function used to read `cachefile`. Use
+                   `geopandas.read_parquet` where `loader` returns a
+                   `geopandas.GeoDataFrame`
+
+    :returns: `pandas.DataFrame` of the data
+    """
+    if isfile(cachefile) and getmtime(cachefile) >= getmtime(srcfile):
+        logger.info(f"Loading {cachefile}")
+        try:
+            return reader(cachefile)
+        except (OSError, ValueError) as err:
+            logger.warning(f"Unable to read {cachefile} ({err}), "
+                           f"reloading {srcfile}")
+    df = loader(srcfile)
+    write_cache(df, cachefile)
+    return df
+
+
+def write_cache(df, cachefile):
+    """
+    Save a `pandas.DataFrame` to a Parquet cache file. The data are written to
+    a temporary file that then replaces `cachefile`, so an interrupted write
+    never leaves a truncated cache behind. A cache that can't be written (e.g.
+    on a read-only share) is skipped with a warning.
+
+    :param df: `pandas.DataFrame` to save
+    :param str cachefile: Path to the Parquet cache file
+    """
+    tmpfile = f"{cachefile}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmpfile, compression='zstd')
+        os.replace(tmpfile, cachefile)
+    except OSError as err:
+        logger.warning(f"Unable to write {cachefile}: {err}")
+        if isfile(tmpfile):
+            os.remove(tmpfile)
+
+
+def load_cached_csv(csvfile, **kwargs):
+    """
+    Read a CSV file, using a Parquet copy of the parsed data if one exists and
+    is newer than the CSV file. The cache file name includes a hash of the
+    arguments passed to `pandas.read_csv`, so different column selections from
+    the same file do not collide.
+
+    :param str csvfile: Path to the CSV file
+    :param kwargs: Additional keyword arguments passed to `pandas.read_csv`
+
+    :returns: `pandas.DataFrame` of the data
+    """
+    key = hashlib.md5(repr(sorted(kwargs.items())).encode()).hexdigest()[:8]
+    cachefile = f"{splitext(csvfile)[0]}.{key}.parquet"
+    return load_cached(csvfile, cachefile,
+                       lambda f: pd.read_csv(f, **kwargs))
@@ -2,13 +2,13 @@ import os
 import re
 import logging
 import argparse
-import glob
+import fnmatch
 
 from configparser import ConfigParser, ExtendedInterpolation, NoOptionError
 from os.path import join as pjoin, realpath, isdir, dirname
 
 from process import pAlreadyProcessed, pWriteProcessedFile, pArchiveFile, pInit
-from files import flStartLog, flGetStat
+from files import flStartLog, flGetStat, flModDate
 
 g_files = {}
 g_output_path = os.getcwd()
@@ -80,8 +80,9 @@ def expandFileSpec(config, spec, category):
     spec and add them to the :dict:`g_files` dict. The `category` variable
     corresponds to a section in the configuration file that includes an item
     called 'OriginDir'. The given `spec` is joined to the `category`'s
-    'OriginDir' and all matching files are stored in a list in
-    :dict:`g_files` under the `category` key.
+    'OriginDir' and all matching files are stored in :dict:`g_files` under
+    the `category` key, as an insertion-ordered dict keyed on the file path
+    (values unused), so each file is listed once in the order it was found.
 
     :param config: `ConfigParser` object
     :param str spec: A file specification. e.g. '*.*' or 'IDW27*.txt'
@@ -89,17 +90,25 @@ def expandFileSpec(config, spec, category):
                          configuration file
     """
     if category not in g_files:
-        g_files[category] = []
+        # Keyed on the file name (values unused): an insertion-ordered set, so
+        # duplicate matches from overlapping specs are dropped in constant time
+        g_files[category] = {}
 
     origindir = config.get(category, 'OriginDir',
                            fallback=config.get('Defaults', 'OriginDir'))
     spec = pjoin(origindir, spec)
-    files = glob.glob(spec)
+    specdir, pattern = os.path.split(spec)
+    # A single scandir pass gives us the names and (cached) stat results,
+    # rather than a glob followed by a separate stat call for every file
+    files = []
+    if isdir(specdir):
+        with os.scandir(specdir) as it:
+            for entry in it:
+                if fnmatch.fnmatch(entry.name, pattern) and entry.is_file():
+                    if entry.stat().st_size > 0:
+                        files.append(entry.path)
     LOGGER.info(f"{len(files)} {spec} files to be processed")
-    for file in files:
-        if os.stat(file).st_size > 0:
-            if file not in g_files[category]:
-                g_files[category].append(file)
+    g_files[category].update(dict.fromkeys(files))
 
 def expandFileSpecs(config, specs, category):
     for spec in specs:
@@ -127,6 +136,12 @@ def processFiles(config):
     category = "Input"
     for f in g_files[category]:
         LOGGER.info(f"Processing {f}")
+        # Check the modification date first - it only needs a stat call,
+        # whereas flGetStat has to read the whole file for the md5 sum
+        directory, fname = os.path.split(f)
+        if pAlreadyProcessed(directory, fname, "moddate", flModDate(f, dateformat="%c")):
+            LOGGER.info(f"Already processed {f}")
+            continue
         directory, fname, md5sum, moddate = flGetStat(f)
         if pAlreadyProcessed(directory, fname, "md5sum", md5sum):
             LOGGER.info(f"Already processed {f}")
@@ -146,13 +146,18 @@ def processFiles(config):
         LOGGER.info(f"Processing {f}")
         fdate = flModDate(f, dateformat=None)
 
-        directory, fname, md5sum, moddate = flGetStat(f)
         cutOffDelta = config.getint(category, 'CutOffDelta', fallback=defaultCutOffDelta)
         cutOffDate = dt.utcnow() - timedelta(hours=cutOffDelta)
         LOGGER.debug(f"Cutoff time is: {cutOffDate}")
         if fdate < cutOffDate:
             LOGGER.info(f"{f} is too old (> {cutOffDelta} hours old). Skipping")
             continue
+        # Only hash the file if the modification date doesn't already match
+        directory, fname = os.path.split(f)
+        if pAlreadyProcessed(directory, fname, "moddate", flModDate(f, dateformat="%c")):
+            LOGGER.info(f"Already processed {f}")
+            continue
+        directory, fname, md5sum, moddate = flGetStat(f)
         if pAlreadyProcessed(directory, fname, "md5sum", md5sum):
             LOGGER.info(f"Already processed {f}")
         else:
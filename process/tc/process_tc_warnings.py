@@ -14,7 +14,7 @@ from os.path import join as pjoin, realpath, isdir, dirname, splitext
 import pandas as pd
 
 from process import pAlreadyProcessed, pWriteProcessedFile, pArchiveFile, pInit, pArchiveTimestamp
-from files import flStartLog, flGetStat
+from files import flStartLog, flGetStat, flModDate
 from tendo import singleton
 
 g_files = {}
@@ -151,13 +151,19 @@ def processFiles(config):
     category = "Input"
     for f in g_files[category]:
         LOGGER.info(f"Processing {f}")
-        directory, fname, md5sum, moddate = flGetStat(f)
+        moddate = flModDate(f, dateformat="%c")
         cutOffDelta = config.getint(category, "CutOffDelta", fallback=6)
         cutOffDateTime = dt.utcnow() - timedelta(hours=cutOffDelta)
         LOGGER.debug(f"Cutoff time is: {cutOffDateTime}")
         if dt.strptime(moddate, "%c") < cutOffDateTime:
             LOGGER.info(f"{f} is too old (> {cutOffDelta} hours old). Skipping")
             continue
+        # Only hash the file if the modification date doesn't already match
+        directory, fname = os.path.split(f)
+        if pAlreadyProcessed(directory, fname, "moddate", moddate):
+            LOGGER.info(f"Already processed {f}")
+            continue
+        directory, fname, md5sum, moddate = flGetStat(f)
         if pAlreadyProcessed(directory, fname, "md5sum", md5sum):
             LOGGER.info(f"Already processed {f}")
         else: